@@ -2,14 +2,11 @@
 BK894 LCR bench meter, using NI-VISA and the pyvisa package."""
 import argparse
 from argparse import RawTextHelpFormatter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-
-try:
-    import pyvisa
-except ImportError as e:
-    print("Could not import pyvisa. Make sure to install NI-visa from:\n\n")
-    print("  https://www.ni.com/nl-nl/support/downloads/drivers/download.ni-visa.html\n\n")
-    print("and then install pyvisa using your package manager.")
+import re
+import threading
+import numpy as np
 
 
 FREQ_QLOG_RANGE = [100, 200, 500,
@@ -19,9 +16,58 @@ FREQ_QLOG_RANGE = [100, 200, 500,
 V_LIN_RANGE = [0.2, 0.4, 0.6, 0.8, 1.0,
                1.2, 1.4, 1.6, 1.8, 2.0]
 DEFAULT_FREQUENCY = 1000
+FREQ_LIMITS = (1, 5E5)
 DEFAULT_VOLTAGE = 0.5
 DEFAULT_KEY = "ZTD"
 
+_VALID_FUNCTIONS = frozenset(["CPD", "CPQ", "CPG", "CPRP", "CSD", "CSQ",
+                              "CSRS", "LPQ", "LPD", "LPG", "LPRP", "LSD",
+                              "LSQ", "LSRS", "RX", "ZTD", "ZTR", "GB",
+                              "YTD", "YTR"])
+_RESULT_HEADERS = {"CPD": ["Cp [F]", "Dissip. [-]"],
+                   "CPQ": ["Cp [F]", "Quality [-]"],
+                   "CPG": ["Cp [F]", "Cond. [S]"],
+                   "CPRP": ["Cp [F]", "Resis. [Ohm]"],
+                   "CSD": ["Cp [F]", "Dissip. [-]"],
+                   "CSQ": ["Cp [F]", "Quality [-]"],
+                   "CSRS": ["Cp [F]", "Resis. [Ohm]"],
+                   "LPD": ["Lp [H]", "Dissip. [-]"],
+                   "LPQ": ["Lp [H]", "Quality [-]"],
+                   "LPG": ["Lp [H]", "Cond. [S]"],
+                   "LPRP": ["Lp [H]", "Resis. [Ohm]"],
+                   "LSD": ["Lp [H]", "Dissip. [-]"],
+                   "LSQ": ["Lp [H]", "Quality [-]"],
+                   "LSRS": ["Lp [H]", "Resis. [Ohm]"],
+                   "ZTD": ["Z [Ohm]", "Theta [Deg]"],
+                   "ZTR": ["Z [Ohm]", "Theta [Rad]"],
+                   "GB": ["Z [Ohm]", "Theta [Deg]"],
+                   "YTD": ["Z [Ohm]", "Theta [Deg]"],
+                   "YTR": ["Z [Ohm]", "Theta [Deg]"]}
+
+_CFG_RE = re.compile(r"^\s*(device|freq|voltage|measurement)\s*=\s*(.*?)\s*$")
+
+_RM = None
+_PRINT_LOCK = threading.Lock()
+
+def _get_rm():
+    """Returns the shared pyvisa resource manager, created on first use.
+
+    pyvisa is only imported here, so commands that do not talk to an
+    instrument (e.g. --help) do not pay for loading VISA.
+
+    """
+    global _RM
+    if _RM is None:
+        try:
+            import pyvisa
+        except ImportError:
+            print("Could not import pyvisa. Make sure to install NI-visa from:\n\n")
+            print("  https://www.ni.com/nl-nl/support/downloads/drivers/download.ni-visa.html\n\n")
+            print("and then install pyvisa using your package manager.")
+            raise
+        _RM = pyvisa.ResourceManager()
+    return _RM
+
 def find_device():
     """Scans for devices and prompts user to select one and returns its name.
 
@@ -31,7 +77,7 @@ def find_device():
              Name of the device.
 
     """
-    rm = pyvisa.ResourceManager()
+    rm = _get_rm()
     devices = rm.list_resources()
     print("\nConnected devices")
     print("----------------------------------------------------")
@@ -54,10 +100,24 @@ def connect_device(device):
     vi     : pyvisa resource object
 
     """
-    rm = pyvisa.ResourceManager()
+    rm = _get_rm()
     try:
         vi = rm.open_resource(device)
         vi.timeout = 5000
+        vi.chunk_size = 1024*1024
+        vi.read_termination = "\n"
+        vi.write_termination = "\n"
+        if vi.resource_class == "SOCKET":
+            # Disable Nagle buffering so short queries are sent at once,
+            # and let TCP probe the link while the session sits idle.
+            # Both are best effort: not every backend supports them.
+            from pyvisa import constants, errors
+            for attr in [constants.VI_ATTR_TCPIP_NODELAY,
+                         constants.VI_ATTR_TCPIP_KEEPALIVE]:
+                try:
+                    vi.set_visa_attribute(attr, constants.VI_TRUE)
+                except errors.VisaIOError:
+                    pass
         query_device(vi)
     except:
         vi = 0
@@ -87,7 +147,7 @@ def query_device(vi):
     print('------------------------------------------')
 
 def frequency_sweep(vi, freqs=FREQ_QLOG_RANGE, V=DEFAULT_VOLTAGE,
-                    key=DEFAULT_KEY):
+                    key=DEFAULT_KEY, cmds=None, list_mode=False):
     """Performs a frequency sweep and returns data.
 
     Parameters
@@ -100,15 +160,25 @@ def frequency_sweep(vi, freqs=FREQ_QLOG_RANGE, V=DEFAULT_VOLTAGE,
     key   : string
             Type of measurement to perform. Check manual
             for available options (defaults to DEFAULT_KEY).
+    cmds  : list(dim=1, type=string)
+            Sweep commands as returned by frequency_commands(freqs)
+            (built from freqs if not provided).
+    list_mode : bool
+            Use the list sweep of the meter to measure all frequencies
+            with a single trigger (defaults to False, see list_sweep).
 
     Returns
     -------
-    data  : list(dim=2)
-            List with with frequencies and measured results.
+    data  : numpy.ndarray(dim=2)
+            Array with frequencies and measured results.
 
     """
+    if len(freqs) == 0:
+        raise Exception("No frequencies requested.")
     if not frequencies_available(freqs):
         raise Exception("Requested frequencies may be out of range.")
+    if cmds is not None and len(cmds) != len(freqs) + 1:
+        raise Exception("Sweep commands do not match frequencies.")
     if measurements_available(key):
         vi.write("FUNC:IMP " + key)
     else:
@@ -118,23 +188,36 @@ def frequency_sweep(vi, freqs=FREQ_QLOG_RANGE, V=DEFAULT_VOLTAGE,
     else:
         raise Exception("Requested voltage out of range.")
 
-    data = [[]*3]*len(freqs)
-    print("\nFrequency sweep")
-    print("AC voltage: {:.3f} V\n".format(V))
-    print("Frequency [Hz]    {:12s}{:12s}".format(*result_header(key)))
-    print("-----------------------------------------")
-    for i, freq in enumerate(freqs):
-        vi.write("FREQ " + str(freq) + "Hz")
-        result = vi.query("fetch?").split(",")[:2]
-        data[i] = [freq, float(result[0]), float(result[1])]
-        print("{:<18.0f}{:<12.3e}{:<12.3e}".format(data[i][0],
-                                                   data[i][1],
-                                                   data[i][2]))
-    print("------------------------------------------\n")
+    data = np.empty((len(freqs), 3), dtype=np.float64)
+    data[:, 0] = freqs
+    if list_mode:
+        data[:, 1:] = list_sweep(vi, freqs)
+    else:
+        if cmds is None:
+            cmds = frequency_commands(freqs)
+        vi.write(cmds[0])
+        for i in range(len(freqs)):
+            result = vi.query_ascii_values(cmds[i+1], converter="f",
+                                           separator=",")
+            data[i, 1] = result[0]
+            data[i, 2] = result[1]
+    rows = []
+    for i in range(len(freqs)):
+        rows.append(f"{data[i, 0]:<18.0f}{data[i, 1]:<12.3e}"
+                    f"{data[i, 2]:<12.3e}")
+    table = ["\nFrequency sweep",
+             "Device: " + vi.resource_name,
+             "AC voltage: {:.3f} V\n".format(V),
+             "Frequency [Hz]    {:12s}{:12s}".format(*result_header(key)),
+             "-----------------------------------------"]
+    table += rows + ["------------------------------------------\n"]
+    # Print the table in one go, so concurrent sweeps do not interleave.
+    with _PRINT_LOCK:
+        print("\n".join(table))
     return data
 
 def amplitude_sweep(vi, V=V_LIN_RANGE, freq=DEFAULT_FREQUENCY,
-                    key=DEFAULT_KEY):
+                    key=DEFAULT_KEY, cmds=None):
     """Performs an amplitude sweep and returns data.
 
     Parameters
@@ -147,14 +230,19 @@ def amplitude_sweep(vi, V=V_LIN_RANGE, freq=DEFAULT_FREQUENCY,
     key   : string
             Type of measurement to perform. Check manual
             for available options (defaults to DEFAULT_KEY).
+    cmds  : list(dim=1, type=string)
+            Sweep commands as returned by voltage_commands(V)
+            (built from V if not provided).
 
     Returns
     -------
-    data  : list(dim=2)
-            List with with amplitudes and measured results.
+    data  : numpy.ndarray(dim=2)
+            Array with amplitudes and measured results.
 
     """
-    if frequencies_available([freq]):
+    if len(V) == 0:
+        raise Exception("No voltages requested.")
+    if FREQ_LIMITS[0] <= freq <= FREQ_LIMITS[1]:
         vi.write("FREQ " + str(freq) + "Hz")
     else:
         raise Exception("Requested frequency may be out of range.")
@@ -162,28 +250,172 @@ def amplitude_sweep(vi, V=V_LIN_RANGE, freq=DEFAULT_FREQUENCY,
         vi.write("FUNC:IMP " + key)
     else:
         raise Exception("Requested measurement is not available.")
-    if not all([0.0 < v <= 2.0 for v in V]):
+    if not all(0.0 < v <= 2.0 for v in V):
         raise Exception("Requested voltages out of range.")
-
-    data = [[]*3]*len(V)
-    print("\nAmplitude sweep")
-    print("Frequency: {:<8.0f} Hz\n".format(freq))
-    print("Amplitude [V]    {:12s}{:12s}".format(*result_header(key)))
-    print("-----------------------------------------")
-    for i, v in enumerate(V):
-        vi.write("VOLT " + str(v) + " V")
-        result = vi.query("fetch?").split(",")[:2]
-        data[i] = [v, float(result[0]), float(result[1])]
-        print("{:<15.3f}{:<12.3e}{:<12.3e}".format(data[i][0],
-                                                   data[i][1],
-                                                   data[i][2]))
-    print("------------------------------------------\n")
+    if cmds is not None and len(cmds) != len(V) + 1:
+        raise Exception("Sweep commands do not match voltages.")
+
+    data = np.empty((len(V), 3), dtype=np.float64)
+    data[:, 0] = V
+    if cmds is None:
+        cmds = voltage_commands(V)
+    vi.write(cmds[0])
+    for i in range(len(V)):
+        result = vi.query_ascii_values(cmds[i+1], converter="f",
+                                       separator=",")
+        data[i, 1] = result[0]
+        data[i, 2] = result[1]
+    rows = []
+    for i in range(len(V)):
+        rows.append(f"{data[i, 0]:<15.3f}{data[i, 1]:<12.3e}"
+                    f"{data[i, 2]:<12.3e}")
+    table = ["\nAmplitude sweep",
+             "Device: " + vi.resource_name,
+             "Frequency: {:<8.0f} Hz\n".format(freq),
+             "Amplitude [V]    {:12s}{:12s}".format(*result_header(key)),
+             "-----------------------------------------"]
+    table += rows + ["------------------------------------------\n"]
+    # Print the table in one go, so concurrent sweeps do not interleave.
+    with _PRINT_LOCK:
+        print("\n".join(table))
     return data
 
-def frequencies_available(freqs, limits=[1, 5E5]):
+def list_sweep(vi, freqs):
+    """Measures all frequencies with a single trigger and returns results.
+
+    The frequencies are loaded into the list sweep table of the meter and
+    one bus trigger steps through the table, after which all results are
+    read back in a single binary block (64 bit reals). The data format,
+    trigger source and display page are restored afterwards, also when
+    the read fails. Requires list sweep support on the meter, check the
+    manual for the number of list points available.
+
+    Parameters
+    ----------
+    vi     : pyvisa resource object
+    freqs  : list(dim=1, type=int)
+             List with frequencies in Hz.
+
+    Returns
+    -------
+    result : numpy.ndarray(dim=2)
+             Array with the two measured values for each frequency.
+
+    """
+    timeout = vi.timeout
+    try:
+        # The reply only arrives once the whole list has been measured.
+        if timeout is not None:
+            vi.timeout = timeout + 1000*len(freqs)
+        vi.write("DISP:PAGE LIST;:LIST:MODE SEQ;:LIST:FREQ " +
+                 ",".join([str(freq) for freq in freqs]) +
+                 ";:FORM:DATA REAL,64;:TRIG:SOUR BUS")
+        values = vi.query_binary_values("*TRG", datatype="d",
+                                        is_big_endian=True,
+                                        container=np.array)
+        # Each point may carry trailing status fields next to the values.
+        return values.reshape(len(freqs), -1)[:, :2]
+    finally:
+        # Discard a late or partial binary reply after a failed read, so
+        # the next ASCII fetch? does not read it.
+        vi.clear()
+        vi.write("FORM:DATA ASC;:TRIG:SOUR INT;:DISP:PAGE MEAS")
+        vi.timeout = timeout
+
+def sweep_commands(setters):
+    """Returns the SCPI commands to step through a sweep.
+
+    The first command applies the first setpoint. Every following command
+    fetches the result for the current setpoint and applies the next one
+    in the same message, so the meter settles while the host parses. The
+    last command only fetches.
+
+    Parameters
+    ----------
+    setters : list(dim=1, type=string)
+              SCPI commands that apply each setpoint.
+
+    Returns
+    -------
+    cmds    : list(dim=1, type=string)
+              List with len(setters) + 1 commands.
+
+    """
+    return (setters[:1] + ["fetch?;:" + cmd for cmd in setters[1:]] +
+            ["fetch?"])
+
+def frequency_commands(freqs):
+    "Returns sweep commands for provided frequencies in Hz."
+    return sweep_commands(["FREQ " + str(freq) + "Hz" for freq in freqs])
+
+def voltage_commands(V):
+    "Returns sweep commands for provided AC voltages in V."
+    return sweep_commands(["VOLT " + str(v) + " V" for v in V])
+
+def batch_sweep(vis, sweep, kwargs, runs=1, fn=None, f_or_a="freq"):
+    """Performs consecutive sweeps on one or more devices concurrently.
+
+    With several devices, each device gets its own worker thread, which
+    performs the sweeps on that device one after the other. A single
+    device is swept in the calling thread. Saving goes through a shared
+    lock so data blocks in the same file do not interleave, and each block
+    is labelled with the name of the device it was measured on. On an
+    interrupt or error no new sweeps are started, and the call returns
+    once running sweeps have finished.
+
+    Parameters
+    ----------
+    vis    : list(dim=1)
+             List with pyvisa resource objects.
+    sweep  : function
+             Sweep to perform: frequency_sweep or amplitude_sweep.
+    kwargs : dict
+             Keyword arguments passed to sweep after the resource object.
+             Its "key" entry (DEFAULT_KEY if absent) is also used for the
+             file header.
+    runs   : int
+             Number of consecutive sweeps per device (defaults to 1).
+    fn     : string
+             Filename to save (append) data, not saved if not provided.
+    f_or_a : string
+             Sweep type: either "freq" or "amplitude"
+
+    """
+    key = kwargs.get("key", DEFAULT_KEY)
+    lock = threading.Lock()
+    stop = threading.Event()
+    hdr = None
+    def run(vi):
+        nonlocal hdr
+        for _ in range(runs):
+            if stop.is_set():
+                return
+            data = sweep(vi, **kwargs)
+            if fn:
+                with lock:
+                    # Looked up once, after the sweep has validated key.
+                    if hdr is None:
+                        hdr = result_header(key)
+                    save_data(data, fn, f_or_a, key, hdr,
+                              vi.resource_name)
+    if len(vis) == 1:
+        run(vis[0])
+        return
+    with ThreadPoolExecutor(max_workers=len(vis)) as ex:
+        futures = [ex.submit(run, vi) for vi in vis]
+        try:
+            for future in futures:
+                future.result()
+        except BaseException:
+            # Includes KeyboardInterrupt: stop workers between sweeps.
+            stop.set()
+            ex.shutdown(wait=True, cancel_futures=True)
+            raise
+
+def frequencies_available(freqs, limits=FREQ_LIMITS):
     "True if provided frequencies are permitted."
-    return (all([freq >= limits[0] for freq in freqs]) and
-            all([freq <= limits[1] for freq in freqs]))
+    lo, hi = limits
+    return all(lo <= freq <= hi for freq in freqs)
 
 def measurements_available(key):
     """True if provided measurement key is valid.
@@ -195,40 +427,18 @@ def measurements_available(key):
           valid options.
 
     """
-    functions = ["CPD", "CPQ", "CPG", "CPRP", "CSD", "CSQ", "CSRS",
-                 "LPQ", "LPD", "LPG", "LPRP", "LSD", "LSQ", "LSRS",
-                 "RX", "ZTD", "ZTR", "GB", "YTD", "YTR"]
-    return (key.upper() in functions)
+    return (key.upper() in _VALID_FUNCTIONS)
 
 def result_header(key):
     "Returns table header entries for selected measurement key."
-    headers = {"CPD": ["Cp [F]", "Dissip. [-]"],
-               "CPQ": ["Cp [F]", "Quality [-]"],
-               "CPG": ["Cp [F]", "Cond. [S]"],
-               "CPRP": ["Cp [F]", "Resis. [Ohm]"],
-               "CSD": ["Cp [F]", "Dissip. [-]"],
-               "CSQ": ["Cp [F]", "Quality [-]"],
-               "CSRS": ["Cp [F]", "Resis. [Ohm]"],
-               "LPD": ["Lp [H]", "Dissip. [-]"],
-               "LPQ": ["Lp [H]", "Quality [-]"],
-               "LPG": ["Lp [H]", "Cond. [S]"],
-               "LPRP": ["Lp [H]", "Resis. [Ohm]"],
-               "LSD": ["Lp [H]", "Dissip. [-]"],
-               "LSQ": ["Lp [H]", "Quality [-]"],
-               "LSRS": ["Lp [H]", "Resis. [Ohm]"],
-               "ZTD": ["Z [Ohm]", "Theta [Deg]"],
-               "ZTR": ["Z [Ohm]", "Theta [Rad]"],
-               "GB": ["Z [Ohm]", "Theta [Deg]"],
-               "YTD": ["Z [Ohm]", "Theta [Deg]"],
-               "YTR": ["Z [Ohm]", "Theta [Deg]"]}
-    return headers[key.upper()]
-
-def save_data(data, fn, f_or_a, key):
+    return _RESULT_HEADERS[key.upper()]
+
+def save_data(data, fn, f_or_a, key, hdr=None, device=None):
     """Saves measurement data in tab-delimited text file.
 
     Parameters
     ----------
-    data   : list (dim=2)
+    data   : numpy.ndarray (dim=2)
              Data to store.
     fn     : string
              Filename.
@@ -236,19 +446,29 @@ def save_data(data, fn, f_or_a, key):
              Sweep type: either "freq" or "amplitude"
     key    : string
              Measurement key for use in file header.
+    hdr    : list(dim=1, type=string)
+             Header entries as returned by result_header(key), looked
+             up if not provided.
+    device : string
+             Device name for use in file header (omitted if not provided).
 
     """
+    if hdr is None:
+        hdr = result_header(key)
     with open(fn, 'a') as f:
         timestamp = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-        f.write("# Timestamp: " + timestamp + "\n")
+        header = "# Timestamp: " + timestamp + "\n"
+        if device:
+            header += "# Device: " + device + "\n"
         if f_or_a == "freq":
-            f.write("# {:6s}\t{:8s}\t{:8s}\n".format("Freq [Hz]",
-                                                     *result_header(key)))
+            header += "# {:6s}\t{:8s}\t{:8s}\n".format("Freq [Hz]", *hdr)
         elif f_or_a == "amplitude":
-            f.write("# {:6s}\t{:8s}\t{:8s}\n".format("Ampl. [V]",
-                                                     *result_header(key)))
-        for d in data:
-            f.write("{:<8}\t{:1.8e}\t{:1.8e}\n".format(*d))
+            header += "# {:6s}\t{:8s}\t{:8s}\n".format("Ampl. [V]", *hdr)
+        f.write(header)
+        # Setpoints keep up to 10 significant digits, so e.g. 0.1234567 V
+        # is written in full rather than rounded to 6 digits by %g.
+        np.savetxt(f, data, fmt=["%-8.10g", "%1.8e", "%1.8e"],
+                   delimiter="\t")
         f.write("\n")
 
 def write_config(fn):
@@ -265,18 +485,18 @@ def write_config(fn):
     """
     device = find_device()
     if device:
+        config = "\n".join([
+            "# Auto-generated configuration file for a frequency sweep.",
+            "# Frequencies are provided in Hz. Feel free to change, but",
+            "# respect the range (1 Hz - 500 kHz) of the equipment. AC",
+            "# voltage can be varied between 50 mV and 2 V. Do not change",
+            "# the device name or the keywords.",
+            "device = " + device,
+            "freq = " + ", ".join([str(freq) for freq in FREQ_QLOG_RANGE]),
+            "voltage = " + str(DEFAULT_VOLTAGE),
+            "measurement = " + DEFAULT_KEY]) + "\n"
         with open(fn, 'w') as f:
-            f.write("# Auto-generated configuration file for a frequency sweep.\n")
-            f.write("# Frequencies are provided in Hz. Feel free to change, but\n")
-            f.write("# respect the range (1 Hz - 500 kHz) of the equipment. AC\n")
-            f.write("# voltage can be varied between 50 mV and 2 V. Do not change\n")
-            f.write("# the device name or the keywords.\n")
-            f.write("device = " + device + "\n")
-            f.write("freq = " +
-                    ", ".join([str(freq) for freq in FREQ_QLOG_RANGE]) +
-                    "\n")
-            f.write("voltage = " + str(DEFAULT_VOLTAGE) + "\n")
-            f.write("measurement = " + DEFAULT_KEY + "\n")
+            f.write(config)
             print("\nConfiguration file saved as: "+ fn)
 
 def read_config(fn):
@@ -299,19 +519,20 @@ def read_config(fn):
              Measurement key (defaults to "ZTD")
 
     """
-    device, freqs, V, key = "", [], [], ""
+    parsers = {"device": lambda v: v,
+               "freq": lambda v: [int(freq) for freq in v.split(",")],
+               "voltage": lambda v: [float(V) for V in v.split(",")],
+               "measurement": lambda v: v}
+    config = {"device": "", "freq": [], "voltage": [], "measurement": ""}
     with open(fn, 'r') as f:
-        for line in f.readlines():
-            if line.split("=")[0].strip() == "device":
-                device = line.split("=")[1].strip()
-            elif line.split("=")[0].strip() == "freq":
-                freqs = [int(freq) for freq in
-                         line.split("=")[1].split(",")]
-            elif line.split("=")[0].strip() == "voltage":
-                V = [float(V) for V in
-                         line.split("=")[1].split(",")]
-            elif line.split("=")[0].strip() == "measurement":
-                key = line.split("=")[1].strip()
+        for line in f:
+            m = _CFG_RE.match(line)
+            if not m:
+                continue
+            k, v = m.group(1), m.group(2)
+            config[k] = parsers[k](v)
+    device, freqs, V, key = (config["device"], config["freq"],
+                             config["voltage"], config["measurement"])
     if not all([device, freqs, V, key]):
         print("Could not parse config file. Make sure to define:\n")
         print("- device\n")
@@ -329,31 +550,28 @@ def parse_args():
     subparsers = parser.add_subparsers(help="command", dest="command")
     subparsers.required = True
 
-    parser_fsweep = subparsers.add_parser("fsweep",
-                        formatter_class=RawTextHelpFormatter,
-                        description="Perform frequency sweep.")
-    parser_fsweep.add_argument("-b", "--batch", action="store_true",
+    parser_sweep = argparse.ArgumentParser(add_help=False)
+    parser_sweep.add_argument("-b", "--batch", action="store_true",
                         help="perform batch run of 5 sweeps and save to file")
-    parser_fsweep.add_argument("--config", required=False,
+    parser_sweep.add_argument("--config", required=False,
                         default="impydance.cfg",
                         help="use provided configuration file\n"
                                "will use impydance.cfg if not provided")
-    parser_fsweep.add_argument("filename", nargs="?",
+    parser_sweep.add_argument("filename", nargs="?",
                         help="filename to save (append) measured data\n"
                              "data will not be saved in no filename is provided")
 
-    parser_asweep = subparsers.add_parser("asweep",
+    parser_fsweep = subparsers.add_parser("fsweep", parents=[parser_sweep],
+                        formatter_class=RawTextHelpFormatter,
+                        description="Perform frequency sweep.")
+    parser_fsweep.add_argument("-l", "--list", action="store_true",
+                        dest="list_mode",
+                        help="use the list sweep of the meter to measure\n"
+                             "all frequencies with a single trigger")
+
+    subparsers.add_parser("asweep", parents=[parser_sweep],
                         formatter_class=RawTextHelpFormatter,
                         description="Perform amplitude sweep.")
-    parser_asweep.add_argument("-b", "--batch", action="store_true",
-                        help="perform batch run of 5 sweeps and save to file")
-    parser_asweep.add_argument("--config", required=False,
-                        default="impydance.cfg",
-                        help="use provided configuration file\n"
-                               "will use impydance.cfg if not provided")
-    parser_asweep.add_argument("filename", nargs="?",
-                        help="filename to save (append) measured data\n"
-                             "data will not be saved in no filename is provided")
 
     parser_config = subparsers.add_parser("cfg",
                         formatter_class=RawTextHelpFormatter,
@@ -372,28 +590,32 @@ def main():
         write_config(inputs.filename)
     elif inputs.command == "fsweep":
         device, freqs, V, key = read_config(inputs.config)
-        vi = connect_device(device)
+        vis = [connect_device(d.strip()) for d in device.split(",")]
         if len(V) > 1:
             print("\nList of voltages supplied, will use first in list.")
+        cmds = None if inputs.list_mode else frequency_commands(freqs)
+        kwargs = {"freqs": freqs, "V": V[0], "key": key, "cmds": cmds,
+                  "list_mode": inputs.list_mode}
         if inputs.filename:
             print("\nCreating or appending to {:s}".format(inputs.filename))
-            for _ in range(5 if inputs.batch else 1):
-                data = frequency_sweep(vi, freqs, V[0], key)
-                save_data(data, inputs.filename, "freq", key)
+            batch_sweep(vis, frequency_sweep, kwargs,
+                        5 if inputs.batch else 1, inputs.filename, "freq")
         else:
-            _ = frequency_sweep(vi, freqs, V[0], key)
+            batch_sweep(vis, frequency_sweep, kwargs)
     elif inputs.command == "asweep":
         device, freqs, V, key = read_config(inputs.config)
-        vi = connect_device(device)
+        vis = [connect_device(d.strip()) for d in device.split(",")]
         if len(freqs) > 1:
             print("\nList of frequencies supplied, will use first in list.")
+        kwargs = {"V": V, "freq": freqs[0], "key": key,
+                  "cmds": voltage_commands(V)}
         if inputs.filename:
             print("\nCreating or appending to {:s}".format(inputs.filename))
-            for _ in range(5 if inputs.batch else 1):
-                data = amplitude_sweep(vi, V, freqs[0], key)
-                save_data(data, inputs.filename, "amplitude", key)
+            batch_sweep(vis, amplitude_sweep, kwargs,
+                        5 if inputs.batch else 1, inputs.filename,
+                        "amplitude")
         else:
-            _ = amplitude_sweep(vi, V, freqs[0], key)
+            batch_sweep(vis, amplitude_sweep, kwargs)
 
 if __name__ == "__main__":
     main()